@@ -8,7 +8,9 @@ import sys
 import os
 import subprocess
 import shutil
-import threading
+import codecs
+import json
+import importlib.util
 from pathlib import Path
 
 # PySide6 导入
@@ -16,81 +18,85 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                                QCheckBox, QProgressBar, QTextEdit, QFileDialog,
                                QMessageBox, QGroupBox, QSizePolicy)
-from PySide6.QtCore import Qt, QThread, Signal, QMimeData
-from PySide6.QtGui import QDragEnterEvent, QDropEvent, QIcon, QFont, QPixmap, QTextCursor, QCursor
+from PySide6.QtCore import (Qt, QProcess, QProcessEnvironment, QObject,
+                            QRunnable, QThreadPool, Signal, QMimeData)
+from PySide6.QtGui import QDragEnterEvent, QDropEvent, QFont, QTextCursor, QCursor
 
 
-class BuildThread(QThread):
-    """打包线程，在后台执行打包操作"""
+# PyInstaller 各阶段日志关键字及对应进度
+BUILD_PHASES = (
+    ('Analysis', 10),
+    ('Building PYZ', 30),
+    ('Building PKG', 50),
+    ('Building EXE', 80),
+    ('Building COLLECT', 95),
+)
+PROGRESS_TAIL_SIZE = max(len(keyword) for keyword, _ in BUILD_PHASES)
+
+# 预热打包进程标记: "<标记> <退出码>"，表示打包结束
+HELPER_DONE_MARKER = "__PYPACKER_BUILD_DONE__"
+
+# 预热打包进程启动脚本: 预先导入 PyInstaller，再从 stdin 读取一条 JSON 打包请求。
+# 每个进程只打包一次，避免 sys.path / sys.modules 等状态残留到下一次打包
+HELPER_BOOTSTRAP = """
+import json, os, sys, traceback
+import PyInstaller.__main__
+
+marker = sys.argv[1]
+line = sys.stdin.readline()
+if not line:
+    sys.exit(0)
+
+request = json.loads(line)
+code = 0
+try:
+    os.chdir(request['cwd'])
+    PyInstaller.__main__.run(request['args'])
+except SystemExit as e:
+    if e.code is None or isinstance(e.code, int):
+        code = e.code or 0
+    else:
+        print(e.code, file=sys.stderr)
+        code = 1
+except BaseException:
+    traceback.print_exc()
+    code = 1
+sys.stderr.flush()
+print(marker, code, flush=True)
+sys.exit(code)
+"""
+
+
+class _InstallSignals(QObject):
+    """安装任务信号"""
     
-    log_signal = Signal(str)
-    finished_signal = Signal(bool)
+    done = Signal(bool, str)
+
+
+class _InstallTask(QRunnable):
+    """安装任务，在线程池中执行 pip 安装"""
     
-    def __init__(self, script_path, output_folder, onefile=True, noconsole=False, icon_path=None):
+    def __init__(self):
         super().__init__()
-        self.script_path = script_path
-        self.output_folder = output_folder
-        self.onefile = onefile
-        self.noconsole = noconsole
-        self.icon_path = icon_path
+        self.signals = _InstallSignals()
     
     def run(self):
-        """执行打包命令"""
-        script_dir = os.path.dirname(os.path.abspath(self.script_path))
-        
-        # 构建命令
-        cmd = [
-            sys.executable, '-m', 'PyInstaller',
-            '--distpath', self.output_folder,
-            '--noconfirm',
-        ]
-        
-        # 添加选项
-        if self.onefile:
-            cmd.append('-F')
-        else:
-            cmd.append('-D')
-        
-        if self.noconsole:
-            cmd.append('-w')
-        
-        # 添加图标
-        if self.icon_path and os.path.exists(self.icon_path):
-            cmd.extend(['--icon', self.icon_path])
-        
-        # 添加脚本路径
-        cmd.append(self.script_path)
-        
-        self.log_signal.emit(f"执行命令: {' '.join(cmd)}")
-        self.log_signal.emit("-" * 50)
-        
+        """执行安装命令"""
         try:
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                cwd=script_dir
+            # 不捕获 pip 输出，避免管道写满阻塞；--no-input 防止等待终端输入
+            result = subprocess.run(
+                [sys.executable, '-m', 'pip', 'install',
+                 '--disable-pip-version-check', '--no-input', 'pyinstaller'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
             )
             
-            # 实时读取输出
-            for line in process.stdout:
-                self.log_signal.emit(line.rstrip())
-            
-            process.wait()
-            
-            if process.returncode == 0:
-                self.log_signal.emit("-" * 50)
-                self.log_signal.emit("打包成功!")
-                self.finished_signal.emit(True)
+            if result.returncode == 0:
+                self.signals.done.emit(True, "安装成功!")
             else:
-                self.log_signal.emit("-" * 50)
-                self.log_signal.emit("打包失败")
-                self.finished_signal.emit(False)
-                
+                self.signals.done.emit(False, "安装失败")
         except Exception as e:
-            self.log_signal.emit(f"执行异常: {str(e)}")
-            self.finished_signal.emit(False)
+            self.signals.done.emit(False, f"安装异常: {str(e)}")
 
 
 class PyPackerWindow(QMainWindow):
@@ -104,7 +110,29 @@ class PyPackerWindow(QMainWindow):
         # 检查依赖
         self.pyinstaller_available = self._check_pyinstaller()
         self.current_script = None
-        self.build_thread = None
+        self.current_script_dir = None
+        self.output_folder = None
+        
+        # 子进程统一以 UTF-8 输出，与日志解码保持一致 (Windows 管道默认为 ANSI 代码页)
+        self._child_env = QProcessEnvironment.systemEnvironment()
+        self._child_env.insert('PYTHONIOENCODING', 'utf-8')
+        
+        # 打包进程，输出直接在 GUI 线程中读取
+        self.proc = QProcess(self)
+        self.proc.setProcessEnvironment(self._child_env)
+        self.proc.setProcessChannelMode(QProcess.MergedChannels)
+        self.proc.readyReadStandardOutput.connect(self._drain)
+        self.proc.finished.connect(self._on_finished)
+        self.proc.errorOccurred.connect(self._on_error)
+        self._decoder = None
+        self._install_task = None
+        self._log_partial_line = False
+        
+        # 预热打包进程，每次打包结束后启动下一个，后续打包免去 PyInstaller 导入开销
+        self._helper = None
+        self._helper_busy = False
+        self._helper_buffer = ''
+        self._progress_tail = ''
         
         # 设置主界面
         self.setup_ui()
@@ -114,11 +142,9 @@ class PyPackerWindow(QMainWindow):
     
     def _check_pyinstaller(self):
         """检查pyinstaller是否可用"""
-        try:
-            import PyInstaller
+        # 只查找模块，不执行导入，避免启动时加载整个 PyInstaller 包
+        if importlib.util.find_spec('PyInstaller') is not None:
             return True
-        except ImportError:
-            pass
         
         return shutil.which('pyinstaller') is not None
     
@@ -163,7 +189,13 @@ class PyPackerWindow(QMainWindow):
                 color: #666;
                 font-size: 12px;
             }
+            QLabel[dropActive="true"] {
+                border: 1px solid #666;
+                background-color: #f0f0f0;
+                color: #333;
+            }
         """)
+        self.drop_label.setProperty("dropActive", False)
         
         # 只在拖放区域响应点击事件
         self.drop_label.mousePressEvent = self.on_drop_label_click
@@ -332,6 +364,9 @@ class PyPackerWindow(QMainWindow):
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setMaximumHeight(140)
+        # 限制日志行数并关闭撤销栈，避免长时间打包时内存与排版开销持续增长
+        self.log_text.document().setMaximumBlockCount(2000)
+        self.log_text.setUndoRedoEnabled(False)
         self.log_text.setStyleSheet("""
             QTextEdit {
                 font-family: Consolas, monospace;
@@ -348,7 +383,7 @@ class PyPackerWindow(QMainWindow):
         
         # ========== 进度条 ==========
         self.progress = QProgressBar()
-        self.progress.setRange(0, 0)
+        self.progress.setRange(0, 100)
         self.progress.setVisible(False)
         self.progress.setFixedHeight(4)
         self.progress.setStyleSheet("""
@@ -369,48 +404,28 @@ class PyPackerWindow(QMainWindow):
             script_path = script_path.strip('"').strip("'")
             
             if script_path.endswith('.py') and os.path.exists(script_path):
-                self.path_edit.setText(script_path)
-                self.current_script = script_path
-                self.pack_btn.setEnabled(True)
+                self.on_file_dropped(script_path)
                 self.start_pack()
     
+    def _set_drop_active(self, active):
+        """切换拖放区域高亮状态"""
+        self.drop_label.setProperty("dropActive", active)
+        self.drop_label.style().unpolish(self.drop_label)
+        self.drop_label.style().polish(self.drop_label)
+    
     def dragEnterEvent(self, event: QDragEnterEvent):
         """拖入事件"""
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
-            self.drop_label.setStyleSheet("""
-                QLabel {
-                    border: 1px solid #666;
-                    border-radius: 4px;
-                    background-color: #f0f0f0;
-                    color: #333;
-                    font-size: 12px;
-                }
-            """)
+            self._set_drop_active(True)
     
     def dragLeaveEvent(self, event):
         """拖出事件"""
-        self.drop_label.setStyleSheet("""
-            QLabel {
-                border: 1px solid #ccc;
-                border-radius: 4px;
-                background-color: #fff;
-                color: #666;
-                font-size: 12px;
-            }
-        """)
+        self._set_drop_active(False)
     
     def dropEvent(self, event: QDropEvent):
         """放下事件"""
-        self.drop_label.setStyleSheet("""
-            QLabel {
-                border: 1px solid #ccc;
-                border-radius: 4px;
-                background-color: #fff;
-                color: #666;
-                font-size: 12px;
-            }
-        """)
+        self._set_drop_active(False)
         
         if event.mimeData().hasUrls():
             for url in event.mimeData().urls():
@@ -431,11 +446,14 @@ class PyPackerWindow(QMainWindow):
     
     def on_file_dropped(self, file_path):
         """文件选择事件"""
-        if os.path.exists(file_path) or file_path.endswith('.py'):
-            self.path_edit.setText(file_path)
-            self.current_script = file_path
-            self.pack_btn.setEnabled(True)
-            self.log(f"已选择: {file_path}")
+        # 选择时一次性解析路径，打包时不再重复计算
+        self.current_script = os.path.abspath(file_path)
+        self.current_script_dir = os.path.dirname(self.current_script)
+        self.output_folder = os.path.join(self.current_script_dir, "输出")
+        
+        self.path_edit.setText(file_path)
+        self.pack_btn.setEnabled(True)
+        self.log(f"已选择: {file_path}")
     
     def browse_file(self):
         """浏览选择文件"""
@@ -468,36 +486,31 @@ class PyPackerWindow(QMainWindow):
         self.progress.setRange(0, 0)
         self.install_btn.setEnabled(False)
         
-        def install_task():
-            try:
-                result = subprocess.run(
-                    [sys.executable, '-m', 'pip', 'install', 'pyinstaller'],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0:
-                    self.pyinstaller_available = True
-                    self.pack_btn.setEnabled(True)
-                    self.log("安装成功!")
-                    self.install_btn.hide()
-                    QMessageBox.information(self, "完成", "PyInstaller 安装成功")
-                else:
-                    self.log(f"安装失败")
-                    QMessageBox.critical(self, "错误", "安装失败")
-                    self.install_btn.setEnabled(True)
-            except Exception as e:
-                self.log(f"安装异常: {str(e)}")
-                QMessageBox.critical(self, "错误", str(e))
-                self.install_btn.setEnabled(True)
-            finally:
-                self.progress.setRange(0, 100)
-                self.progress.setVisible(False)
-        
-        threading.Thread(target=install_task, daemon=True).start()
+        self._install_task = _InstallTask()
+        self._install_task.signals.done.connect(self._on_install_done)
+        QThreadPool.globalInstance().start(self._install_task)
+    
+    def _on_install_done(self, success, message):
+        """安装完成，在 GUI 线程中更新界面"""
+        self._install_task = None
+        self.progress.setRange(0, 100)
+        self.progress.setVisible(False)
+        self.log(message)
+        
+        if success:
+            self.pyinstaller_available = True
+            self.pack_btn.setEnabled(True)
+            self.install_btn.hide()
+            QMessageBox.information(self, "完成", "PyInstaller 安装成功")
+        else:
+            QMessageBox.critical(self, "错误", message)
+            self.install_btn.setEnabled(True)
     
     def start_pack(self):
         """开始打包"""
+        if self.proc.state() != QProcess.NotRunning or self._helper_busy:
+            return
+        
         if not self.current_script:
             QMessageBox.warning(self, "提示", "请先选择脚本")
             return
@@ -513,25 +526,200 @@ class PyPackerWindow(QMainWindow):
             return
         
         self.log_text.clear()
-        script_dir = os.path.dirname(os.path.abspath(script_path))
-        output_folder = os.path.join(script_dir, "输出")
+        self._log_partial_line = False
+        script_dir = self.current_script_dir
+        output_folder = self.output_folder
         
         self.pack_btn.setEnabled(False)
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
         self.progress.setVisible(True)
-        self.progress.setRange(0, 0)
+        self._progress_tail = ''
         
-        self.build_thread = BuildThread(
-            script_path=script_path,
-            output_folder=output_folder,
-            onefile=self.onefile_check.isChecked(),
-            noconsole=self.noconsole_check.isChecked(),
-            icon_path=self.icon_edit.text() or None
-        )
+        # 构建命令
+        # spec 与 build 目录显式指定，PyInstaller 默认值取自导入时的工作目录，
+        # 预热进程中不会随 chdir 改变
+        args = [
+            '--distpath', output_folder,
+            '--specpath', script_dir,
+            '--workpath', os.path.join(script_dir, 'build'),
+            '--noconfirm',
+        ]
         
-        self.build_thread.log_signal.connect(self.log)
-        self.build_thread.finished_signal.connect(self.on_pack_finished)
+        # 添加选项
+        if self.onefile_check.isChecked():
+            args.append('-F')
+        else:
+            args.append('-D')
+        
+        if self.noconsole_check.isChecked():
+            args.append('-w')
         
-        self.build_thread.start()
+        # 添加图标
+        icon_path = self.icon_edit.text()
+        if icon_path and os.path.exists(icon_path):
+            args.extend(['--icon', icon_path])
+        
+        # 添加脚本路径
+        args.append(script_path)
+        
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        
+        # 优先交给已预热的打包进程
+        if self._helper is not None and self._helper.state() == QProcess.Running:
+            self.log(f"执行命令 (预热进程): PyInstaller {' '.join(args)}")
+            self.log("-" * 50)
+            
+            self._helper_busy = True
+            self._helper_buffer = ''
+            request = json.dumps({'cwd': script_dir, 'args': args}) + "\n"
+            self._helper.write(request.encode('utf-8'))
+            self._helper.closeWriteChannel()
+            return
+        
+        args = ['-m', 'PyInstaller'] + args
+        self.log(f"执行命令: {' '.join([sys.executable] + args)}")
+        self.log("-" * 50)
+        
+        self.proc.setWorkingDirectory(script_dir)
+        self.proc.start(sys.executable, args)
+    
+    def _update_progress(self, text):
+        """根据 PyInstaller 阶段日志更新进度"""
+        # 带上一块末尾，防止阶段关键字被截断在两块之间
+        text = self._progress_tail + text
+        self._progress_tail = text[-PROGRESS_TAIL_SIZE:]
+        
+        value = self.progress.value()
+        for keyword, percent in BUILD_PHASES:
+            if percent > value and keyword in text:
+                value = percent
+        if value != self.progress.value():
+            self.progress.setValue(value)
+    
+    def _insert_log_text(self, text):
+        """原样追加进程输出到日志"""
+        if not text:
+            return
+        
+        # 与 append 保持一致: 文档末尾不留换行，新输出另起一段
+        if not self._log_partial_line and not self.log_text.document().isEmpty():
+            text = "\n" + text
+        if text.endswith("\r\n"):
+            text = text[:-2]
+            self._log_partial_line = False
+        elif text.endswith(("\n", "\r")):
+            text = text[:-1]
+            self._log_partial_line = False
+        else:
+            self._log_partial_line = True
+        
+        self.log_text.moveCursor(QTextCursor.MoveOperation.End)
+        self.log_text.insertPlainText(text)
+        self.log_text.ensureCursorVisible()
+    
+    def _drain(self):
+        """读取打包进程输出"""
+        text = self._decoder.decode(bytes(self.proc.readAllStandardOutput()))
+        self._update_progress(text)
+        self._insert_log_text(text)
+    
+    def _on_finished(self, exit_code, exit_status):
+        """打包进程结束"""
+        self._drain()
+        self._insert_log_text(self._decoder.decode(b'', final=True))
+        
+        success = exit_status == QProcess.NormalExit and exit_code == 0
+        self._finish_build(success)
+    
+    def _finish_build(self, success):
+        """输出打包结果"""
+        # 预热下一次打包用的进程
+        if self._helper is None or self._helper.state() == QProcess.NotRunning:
+            self._start_helper()
+        
+        self.log("-" * 50)
+        self.log("打包成功!" if success else "打包失败")
+        self.on_pack_finished(success)
+    
+    def _start_helper(self):
+        """启动预热打包进程"""
+        if self._helper is not None:
+            self._helper.deleteLater()
+        
+        self._helper = QProcess(self)
+        self._helper.setProcessEnvironment(self._child_env)
+        self._helper.setProcessChannelMode(QProcess.MergedChannels)
+        self._helper.readyReadStandardOutput.connect(self._drain_helper)
+        self._helper.finished.connect(self._on_helper_finished)
+        self._helper.start(sys.executable, ['-u', '-c', HELPER_BOOTSTRAP, HELPER_DONE_MARKER])
+    
+    def _drain_helper(self):
+        """读取预热进程输出，按标记行判断打包结束"""
+        data = bytes(self._helper.readAllStandardOutput())
+        # 空闲时的输出 (如导入警告) 直接丢弃
+        if not self._helper_busy:
+            return
+        
+        lines = (self._helper_buffer + self._decoder.decode(data)).splitlines(keepends=True)
+        self._helper_buffer = ''
+        if lines and not lines[-1].endswith(('\n', '\r')):
+            self._helper_buffer = lines.pop()
+        
+        chunks = []
+        for line in lines:
+            # 之前的输出可能没有换行，标记不一定位于行首
+            if HELPER_DONE_MARKER in line:
+                before, _, after = line.partition(HELPER_DONE_MARKER)
+                chunks.append(before)
+                text = ''.join(chunks)
+                self._update_progress(text)
+                self._insert_log_text(text)
+                self._helper_busy = False
+                self._release_helper()
+                self._finish_build(after.split()[:1] == ['0'])
+                return
+            chunks.append(line)
+        text = ''.join(chunks)
+        self._update_progress(text)
+        self._insert_log_text(text)
+    
+    def _release_helper(self):
+        """交出已完成打包的预热进程，任其自行退出"""
+        helper = self._helper
+        self._helper = None
+        helper.readyReadStandardOutput.disconnect(self._drain_helper)
+        helper.finished.disconnect(self._on_helper_finished)
+        if helper.state() == QProcess.NotRunning:
+            helper.deleteLater()
+        else:
+            helper.finished.connect(helper.deleteLater)
+    
+    def _on_helper_finished(self, exit_code, exit_status):
+        """预热进程退出，下次打包改为新建进程"""
+        helper = self._helper
+        if self._helper_busy:
+            self._drain_helper()
+        
+        # 上面读到标记行时进程已被交出，打包结果也已输出
+        if self._helper is not helper:
+            return
+        
+        self._helper = None
+        helper.deleteLater()
+        
+        if self._helper_busy:
+            self._helper_busy = False
+            self._insert_log_text(self._helper_buffer)
+            self._helper_buffer = ''
+            self._finish_build(False)
+    
+    def _on_error(self, error):
+        """打包进程启动失败"""
+        # 其他错误会随 finished 信号一并处理
+        if error == QProcess.FailedToStart:
+            self.log(f"执行异常: {self.proc.errorString()}")
+            self.on_pack_finished(False)
     
     def on_pack_finished(self, success):
         """打包完成"""
@@ -540,16 +728,11 @@ class PyPackerWindow(QMainWindow):
         self.pack_btn.setEnabled(True)
         
         if success:
-            output_path = os.path.join(
-                os.path.dirname(os.path.abspath(self.current_script)),
-                "输出"
-            )
-            
             if QMessageBox.question(
                 self, "完成", "打包完成，是否打开输出目录？",
                 QMessageBox.Yes | QMessageBox.No
             ) == QMessageBox.Yes:
-                self.open_folder(output_path)
+                self.open_folder(self.output_folder)
     
     def open_folder(self, path):
         """打开文件夹"""
@@ -561,12 +744,18 @@ class PyPackerWindow(QMainWindow):
         except Exception as e:
             self.log(f"无法打开: {str(e)}")
     
+    def closeEvent(self, event):
+        """关闭窗口时结束预热打包进程"""
+        if self._helper is not None:
+            self._helper.finished.disconnect(self._on_helper_finished)
+            self._helper.kill()
+            self._helper.waitForFinished(1000)
+        super().closeEvent(event)
+    
     def log(self, message):
         """添加日志"""
+        self._log_partial_line = False
         self.log_text.append(message)
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.log_text.setTextCursor(cursor)
 
 
 def main():